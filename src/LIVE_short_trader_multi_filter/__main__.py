@@ -7,11 +7,12 @@ Usage:
 """
 
 from .config import TraderConfig
-from .main_engine import MainEngine
 
 
 def main() -> None:
     """Execute the orchestrator."""
+    from .main_engine import MainEngine  # deferred: pulls in pandas/numpy/numba and pybit
+
     MainEngine(config=TraderConfig()).run()
 
 
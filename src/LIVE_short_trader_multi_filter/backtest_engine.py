@@ -1,15 +1,42 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import copy
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from dataclasses import dataclass, fields
 from itertools import product
-from typing import Dict, List
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence
 
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
+
+try:
+    from tqdm import tqdm
+except ImportError:  # tqdm is optional; without it the grid search runs without a progress bar.
+
+    class tqdm:  # noqa: N801 - stands in for tqdm.tqdm
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def update(self, n: int = 1) -> None:
+            pass
+
 
 from .config import TraderConfig
-from .order_utils import PositionState
+from .order_utils import NUMBA_AVAILABLE, njit, precompute_fills, prange, rolling_low_high
+
+# Exit reasons are carried as small integer codes inside the simulator.
+EXIT_TYPES = ("tp", "momentum", "final_close")
 
 
 @dataclass
@@ -39,6 +66,177 @@ class BacktestMetrics:
     losses: int
 
 
+@njit(cache=True)
+def _simulate_nb(
+    low: np.ndarray,
+    close: np.ndarray,
+    entry_ok: np.ndarray,
+    mom_exit: np.ndarray,
+    warmup: int,
+    starting_balance: float,
+    risk_fraction: float,
+    margin_rate: float,
+    min_notional: float,
+    fill_price: np.ndarray,
+    fill_ok: np.ndarray,
+    tp_target: np.ndarray,
+    equity: np.ndarray,
+    capture_trades: bool,
+):
+    # Bar-by-bar short simulator; fills the caller's ``equity`` buffer and returns its length, win/loss stats and trades.
+    n = len(close)
+    max_trades = max(n - warmup + 1, 1) if capture_trades else 0
+    trade_entry_idx = np.empty(max_trades, dtype=np.int64)
+    trade_exit_idx = np.empty(max_trades, dtype=np.int64)
+    trade_exit_price = np.empty(max_trades)
+    trade_pnl = np.empty(max_trades)
+    trade_qty = np.empty(max_trades)
+    trade_exit_code = np.empty(max_trades, dtype=np.int8)
+
+    balance = starting_balance
+    n_eq = 0
+    n_trades = 0
+    wins = 0
+    losses = 0
+    win_sum = 0.0
+    loss_sum = 0.0
+    position_open = False
+    entry_price = 0.0
+    tp_price = 0.0
+    qty = 0.0
+    margin_used = 0.0
+    entry_idx = 0
+
+    for i in range(warmup, n):
+        if not position_open:
+            if entry_ok[i] and fill_ok[i]:
+                price = fill_price[i]
+                margin = balance * risk_fraction
+                entry_qty = (margin / margin_rate) / price
+                if margin > 0 and entry_qty > 0 and margin / margin_rate >= min_notional:
+                    balance -= margin
+                    position_open = True
+                    entry_price = price
+                    tp_price = tp_target[i]
+                    qty = entry_qty
+                    margin_used = margin
+                    entry_idx = i
+                    equity[n_eq] = balance + margin_used
+                    n_eq += 1
+                    continue
+        else:
+            tp_hit = low[i] <= tp_price
+            if tp_hit or mom_exit[i]:
+                exit_price = tp_price if tp_hit else close[i]
+                gross = (entry_price - exit_price) * qty  # short PnL
+                balance += margin_used + gross
+                pnl_pct = (gross / starting_balance) * 100
+                if gross > 0:
+                    wins += 1
+                    win_sum += pnl_pct
+                else:
+                    losses += 1
+                    loss_sum += pnl_pct
+                if capture_trades:
+                    trade_entry_idx[n_trades] = entry_idx
+                    trade_exit_idx[n_trades] = i
+                    trade_exit_price[n_trades] = exit_price
+                    trade_pnl[n_trades] = gross
+                    trade_qty[n_trades] = qty
+                    trade_exit_code[n_trades] = 0 if tp_hit else 1
+                    n_trades += 1
+                position_open = False
+
+        equity[n_eq] = balance + (margin_used if position_open else 0.0)
+        n_eq += 1
+
+    if position_open:
+        # Close any open trade at the last available price rather than force-marking it as a loss.
+        final_close = close[n - 1]
+        gross = (entry_price - final_close) * qty
+        balance += margin_used + gross
+        pnl_pct = (gross / starting_balance) * 100
+        if gross > 0:
+            wins += 1
+            win_sum += pnl_pct
+        else:
+            losses += 1
+            loss_sum += pnl_pct
+        if capture_trades:
+            trade_entry_idx[n_trades] = entry_idx
+            trade_exit_idx[n_trades] = n - 1
+            trade_exit_price[n_trades] = final_close
+            trade_pnl[n_trades] = gross
+            trade_qty[n_trades] = qty
+            trade_exit_code[n_trades] = 2
+            n_trades += 1
+        equity[n_eq] = balance
+        n_eq += 1
+
+    return (
+        n_eq,
+        wins,
+        losses,
+        win_sum,
+        loss_sum,
+        trade_entry_idx,
+        trade_exit_idx,
+        trade_exit_price,
+        trade_pnl,
+        trade_qty,
+        trade_exit_code,
+        n_trades,
+    )
+
+
+@njit(cache=True, parallel=True)
+def _simulate_batch_nb(
+    low: np.ndarray,
+    close: np.ndarray,
+    entry_ok: np.ndarray,
+    mom_exit: np.ndarray,
+    warmup: int,
+    starting_balance: float,
+    risk_fraction: float,
+    margin_rate: float,
+    min_notional: float,
+    fill_price: np.ndarray,
+    fill_ok: np.ndarray,
+    tp_target: np.ndarray,
+    equity: np.ndarray,
+):
+    # ``_simulate_nb`` for each row of the (combos x bars) masks in parallel, one ``equity`` row per combo.
+    n_combos = entry_ok.shape[0]
+    n_eq = np.empty(n_combos, dtype=np.int64)
+    wins = np.empty(n_combos, dtype=np.int64)
+    losses = np.empty(n_combos, dtype=np.int64)
+    win_sum = np.empty(n_combos)
+    loss_sum = np.empty(n_combos)
+    for c in prange(n_combos):
+        result = _simulate_nb(
+            low,
+            close,
+            entry_ok[c],
+            mom_exit[c],
+            warmup,
+            starting_balance,
+            risk_fraction,
+            margin_rate,
+            min_notional,
+            fill_price,
+            fill_ok,
+            tp_target,
+            equity[c],
+            False,
+        )
+        n_eq[c] = result[0]
+        wins[c] = result[1]
+        losses[c] = result[2]
+        win_sum[c] = result[3]
+        loss_sum[c] = result[4]
+    return n_eq, wins, losses, win_sum, loss_sum
+
+
 def summarize_results(best_row: pd.DataFrame, starting_balance: float) -> Dict[str, float]:
     l = best_row.iloc[0]
     total_trades = int(l["wins"] + l["losses"])
@@ -61,191 +259,762 @@ def summarize_results(best_row: pd.DataFrame, starting_balance: float) -> Dict[s
     }
 
 
-class BacktestEngine:
-    def __init__(self, config: TraderConfig):
-        self.config = config
-        self._last_trades: List[Dict] = []
-
-    def _run_backtest(self, df: pd.DataFrame, params: StrategyParams, capture_trades: bool = False) -> BacktestMetrics:
-        data = df.copy().sort_index()
-        data["sma"] = data["Close"].rolling(params.sma_period).mean()
-
-        lowest_low = data["Low"].rolling(params.stoch_period).min()
-        highest_high = data["High"].rolling(params.stoch_period).max()
-        raw_stoch = 100 * (data["Close"] - lowest_low) / (highest_high - lowest_low)
-        raw_stoch = raw_stoch.replace([np.inf, -np.inf], np.nan).fillna(0)
-        data["k"] = raw_stoch.rolling(self.config.smooth_k).mean() - 50
-
-        data["ema_fast"] = data["Close"].ewm(span=params.macd_fast, adjust=False).mean()
-        data["ema_slow"] = data["Close"].ewm(span=params.macd_slow, adjust=False).mean()
-        data["macd"] = data["ema_fast"] - data["ema_slow"]
-        data["signal"] = data["macd"].ewm(span=params.macd_signal, adjust=False).mean()
-
-        balance = self.config.starting_balance
-        equity_curve: List[float] = []
-        position: PositionState | None = None
-        wins = 0
-        losses = 0
-        win_sizes: List[float] = []
-        loss_sizes: List[float] = []
-        trades: List[Dict] = [] if capture_trades else []
-
-        warmup = max(params.sma_period, params.stoch_period, params.macd_slow, params.macd_signal) + 2
-        for i in range(warmup, len(data)):
-            row = data.iloc[i]
-            close = float(row["Close"])
-
-            year = row.name.year
-            month = row.name.month
-            in_date = (year > self.config.start_year) or (year == self.config.start_year and month >= self.config.start_month)
-
-            if position is None:
-                if not in_date:
-                    equity_curve.append(balance)
-                    continue
+def _market_arrays(data: pd.DataFrame, config: TraderConfig) -> Dict[str, np.ndarray]:
+    # Price columns, per-bar entry fills/take-profit targets and the date mask as plain arrays.
+    year = data.index.year.to_numpy()
+    month = data.index.month.to_numpy()
+    close = data["Close"].to_numpy(dtype=np.float64)
+    fill_price, fill_ok = precompute_fills(close, config)
+    return {
+        "high": data["High"].to_numpy(dtype=np.float64),
+        "low": data["Low"].to_numpy(dtype=np.float64),
+        "close": close,
+        "fill_price": fill_price,
+        "fill_ok": fill_ok,
+        "tp_target": fill_price * (1 - config.take_profit_pct),
+        "in_date": (year > config.start_year) | ((year == config.start_year) & (month >= config.start_month)),
+    }
 
-                lows_ok = data["Low"].iloc[i - 2] <= data["Low"].iloc[i - 1] and data["Low"].iloc[i] < data["Low"].iloc[i - 1]
-                sma_ok = row["sma"] < data["sma"].iloc[i - 1]
-                macd_ok = (not params.use_macd) or (row["macd"] < data["macd"].iloc[i - 1])
-                signal_ok = (not params.use_signal) or (row["signal"] < data["signal"].iloc[i - 1])
-
-                if lows_ok and sma_ok and macd_ok and signal_ok and not np.isnan(row["sma"]):
-                    risk_fraction = self.config.risk_fraction
-                    margin_rate = self.config.margin_rate
-                    position_value = (balance * risk_fraction) / margin_rate
-                    qty = position_value / close
-                    margin_used = balance * risk_fraction
-                    if margin_used <= 0 or qty <= 0:
-                        equity_curve.append(balance)
-                        continue
-
-                    balance -= margin_used
-                    tp_price = close * (1 - 0.004)
-                    position = PositionState(side="short", entry_price=close, tp_price=tp_price, qty=qty, entry_bar_time=row.name, margin_used=margin_used)
-                    equity_curve.append(balance + margin_used)
-                    continue
 
-            else:
-                exit_price: float | None = None
-                tp_hit = row["Low"] <= (position.tp_price or 0)
-                mom_exit = params.use_momentum_exit and (row["k"] > data["k"].iloc[i - 1])
-
-                if tp_hit:
-                    exit_price = float(position.tp_price)
-                elif mom_exit:
-                    exit_price = close
-
-                if exit_price is not None:
-                    gross = (position.entry_price - exit_price) * position.qty  # short PnL
-                    balance += position.margin_used + gross
-                    pnl_pct = (gross / self.config.starting_balance) * 100
-                    if gross > 0:
-                        wins += 1
-                        win_sizes.append(pnl_pct)
-                    else:
-                        losses += 1
-                        loss_sizes.append(pnl_pct)
-                    if capture_trades:
-                        trades.append(
-                            {
-                                "entry_time": position.entry_bar_time,
-                                "exit_time": row.name,
-                                "side": "SHORT",
-                                "entry_price": position.entry_price,
-                                "exit_price": exit_price,
-                                "pnl_value": gross,
-                                "pnl_pct": pnl_pct,
-                                "qty": position.qty,
-                                "exit_type": "tp" if tp_hit else "momentum",
-                            }
-                        )
-                    position = None
-
-            equity_curve.append(balance + (position.margin_used if position else 0))
-
-        if position is not None:
-            # Close any open trade at the last available price rather than force-marking it as a loss.
-            final_close = float(data.iloc[-1]["Close"])
-            gross = (position.entry_price - final_close) * position.qty
-            balance += position.margin_used + gross
-            pnl_pct = (gross / self.config.starting_balance) * 100
-            if gross > 0:
-                wins += 1
-                win_sizes.append(pnl_pct)
-            else:
-                losses += 1
-                loss_sizes.append(pnl_pct)
-            if capture_trades:
-                trades.append(
-                    {
-                        "entry_time": position.entry_bar_time,
-                        "exit_time": data.index[-1],
-                        "side": "SHORT",
-                        "entry_price": position.entry_price,
-                        "exit_price": final_close,
-                        "pnl_value": gross,
-                        "pnl_pct": pnl_pct,
-                        "qty": position.qty,
-                        "exit_type": "final_close",
-                    }
-                )
-            equity_curve.append(balance)
+def _stoch_extremes(arrays: Dict[str, np.ndarray], period: int) -> tuple[np.ndarray, np.ndarray]:
+    return rolling_low_high(arrays["low"], arrays["high"], period)
+
+
+@njit(cache=True)
+def _mean_add(state: np.ndarray, value: float) -> None:
+    # Compensated running mean mirroring pandas' rolling mean, so ties between consecutive means match it exactly.
+    state[2] += 1
+    y = value - state[1]
+    t = state[0] + y
+    state[1] = t - state[0] - y
+    state[0] = t
+    if value < 0:
+        state[3] += 1
+    state[4] = state[4] + 1 if value == state[5] else 1
+    state[5] = value
+
+
+@njit(cache=True)
+def _mean_remove(state: np.ndarray, value: float) -> None:
+    state[2] -= 1
+    y = -value - state[6]
+    t = state[0] + y
+    state[6] = t - state[0] - y
+    state[0] = t
+    if value < 0:
+        state[3] -= 1
+
+
+@njit(cache=True)
+def _mean_value(state: np.ndarray, window: int) -> float:
+    nobs = state[2]
+    if nobs < window:
+        return np.nan
+    if state[4] >= nobs:
+        return state[5]
+    result = state[0] / nobs
+    if state[3] == 0 and result < 0:
+        return 0.0
+    if state[3] == nobs and result > 0:
+        return 0.0
+    return result
+
+
+@njit(cache=True)
+def _ema_step(ema: float, value: float, alpha: float) -> float:
+    # adjust=False EWM update, written as pandas computes it.
+    if ema == value:
+        return ema
+    old_wt = 1.0 - alpha
+    return (old_wt * ema + alpha * value) / (old_wt + alpha)
+
+
+@njit(cache=True)
+def _filter_masks_nb(
+    low: np.ndarray,
+    close: np.ndarray,
+    in_date: np.ndarray,
+    lowest_low: np.ndarray,
+    highest_high: np.ndarray,
+    sma_period: int,
+    smooth_k: int,
+    macd_fast: int,
+    macd_slow: int,
+    macd_signal: int,
+):
+    # One fused pass over the bars: SMA, centered %K, MACD/Signal and the four filter masks.
+    n = len(close)
+    base = np.zeros(n, dtype=np.bool_)
+    macd_falling = np.zeros(n, dtype=np.bool_)
+    signal_falling = np.zeros(n, dtype=np.bool_)
+    k_rising = np.zeros(n, dtype=np.bool_)
+
+    alpha_fast = 2.0 / (macd_fast + 1)
+    alpha_slow = 2.0 / (macd_slow + 1)
+    alpha_signal = 2.0 / (macd_signal + 1)
+    sma_state = np.zeros(7)
+    raw_state = np.zeros(7)
+    raw_ring = np.zeros(smooth_k)
+    ema_fast = 0.0
+    ema_slow = 0.0
+    signal = 0.0
+    prev_sma = np.nan
+    prev_k = np.nan
+    prev_macd = np.nan
+    prev_signal = np.nan
+
+    for i in range(n):
+        price = close[i]
+
+        if i >= sma_period:
+            _mean_remove(sma_state, close[i - sma_period])
+        _mean_add(sma_state, price)
+        sma = _mean_value(sma_state, sma_period)
+
+        # Raw stoch is zeroed while the window is filling or the range is flat, then smoothed over smooth_k bars.
+        price_range = highest_high[i] - lowest_low[i]
+        raw = 100.0 * (price - lowest_low[i]) / price_range if price_range != 0 else 0.0
+        if not math.isfinite(raw):
+            raw = 0.0
+        slot = i % smooth_k
+        if i >= smooth_k:
+            _mean_remove(raw_state, raw_ring[slot])
+        _mean_add(raw_state, raw)
+        raw_ring[slot] = raw
+        k = _mean_value(raw_state, smooth_k) - 50
+
+        if i == 0:
+            ema_fast = price
+            ema_slow = price
+        else:
+            ema_fast = _ema_step(ema_fast, price, alpha_fast)
+            ema_slow = _ema_step(ema_slow, price, alpha_slow)
+        macd = ema_fast - ema_slow
+        signal = macd if i == 0 else _ema_step(signal, macd, alpha_signal)
+
+        if i >= 2:
+            base[i] = (
+                low[i - 2] <= low[i - 1]
+                and low[i] < low[i - 1]
+                and sma < prev_sma
+                and not np.isnan(sma)
+                and in_date[i]
+            )
+        macd_falling[i] = macd < prev_macd
+        signal_falling[i] = signal < prev_signal
+        k_rising[i] = k > prev_k
+
+        prev_sma = sma
+        prev_k = k
+        prev_macd = macd
+        prev_signal = signal
+
+    return base, macd_falling, signal_falling, k_rising
+
+
+# Per-combination statistics written by ``_grid_kernel``; ``_metrics_from_stats`` turns a row into BacktestMetrics.
+GRID_STATS = ("n_eq", "final_balance", "wins", "losses", "win_sum", "loss_sum", "sharpe_ratio")
+
+
+@njit(cache=True, error_model="numpy")
+def _sharpe_ratio_nb(equity: np.ndarray) -> float:
+    # Unannualized mean/std (ddof=1) of the bar returns, as ``_metrics`` computes it in NumPy.
+    n_returns = 0
+    total = 0.0
+    for i in range(1, len(equity)):
+        ret = (equity[i] - equity[i - 1]) / equity[i - 1]
+        if not np.isnan(ret):
+            n_returns += 1
+            total += ret
+    if n_returns < 2:
+        return np.nan
+    mean = total / n_returns
+    sq_dev = 0.0
+    for i in range(1, len(equity)):
+        ret = (equity[i] - equity[i - 1]) / equity[i - 1]
+        if not np.isnan(ret):
+            sq_dev += (ret - mean) * (ret - mean)
+    std = np.sqrt(sq_dev / (n_returns - 1))
+    if std == 0:
+        return 0.0
+    return mean / std
+
+
+@njit(cache=True, parallel=True)
+def _grid_kernel(
+    low: np.ndarray,
+    high: np.ndarray,
+    close: np.ndarray,
+    in_date: np.ndarray,
+    fill_price: np.ndarray,
+    fill_ok: np.ndarray,
+    tp_target: np.ndarray,
+    sma_periods: np.ndarray,
+    stoch_periods: np.ndarray,
+    use_macd: np.ndarray,
+    use_signal: np.ndarray,
+    use_momentum_exit: np.ndarray,
+    smooth_k: int,
+    macd_fast: int,
+    macd_slow: int,
+    macd_signal: int,
+    starting_balance: float,
+    risk_fraction: float,
+    margin_rate: float,
+    min_notional: float,
+):
+    # Whole grid-search inner loop, one prange iteration per (sma, stoch) pair; returns pairs x flags x GRID_STATS.
+    n = len(close)
+    n_pairs = len(sma_periods)
+    n_flags = len(use_macd)
+    out = np.empty((n_pairs, n_flags, len(GRID_STATS)))
+    for p in prange(n_pairs):
+        lowest_low, highest_high = rolling_low_high(low, high, stoch_periods[p])
+        base, macd_falling, signal_falling, k_rising = _filter_masks_nb(
+            low, close, in_date, lowest_low, highest_high, sma_periods[p], smooth_k, macd_fast, macd_slow, macd_signal
+        )
+        warmup = max(sma_periods[p], stoch_periods[p], macd_slow, macd_signal) + 2
+        equity = np.empty(n + 1)
+        no_exit = np.zeros(n, dtype=np.bool_)
+        for f in range(n_flags):
+            entry_ok = base.copy()
+            if use_macd[f]:
+                entry_ok &= macd_falling
+            if use_signal[f]:
+                entry_ok &= signal_falling
+            mom_exit = k_rising if use_momentum_exit[f] else no_exit
+            result = _simulate_nb(
+                low,
+                close,
+                entry_ok,
+                mom_exit,
+                warmup,
+                starting_balance,
+                risk_fraction,
+                margin_rate,
+                min_notional,
+                fill_price,
+                fill_ok,
+                tp_target,
+                equity,
+                False,
+            )
+            n_eq = result[0]
+            out[p, f, 0] = n_eq
+            out[p, f, 1] = equity[n_eq - 1] if n_eq > 0 else starting_balance
+            out[p, f, 2] = result[1]
+            out[p, f, 3] = result[2]
+            out[p, f, 4] = result[3]
+            out[p, f, 5] = result[4]
+            out[p, f, 6] = _sharpe_ratio_nb(equity[:n_eq])
+    return out
+
+
+LIVE_INDICATOR_COLUMNS = ("sma", "k", "ema_fast", "ema_slow", "macd", "signal")
+
+
+class LiveIndicatorState:
+    # Running indicators for the live loop; pushing a history bar by bar equals a pandas recompute over it.
+
+    def __init__(self, params: StrategyParams, smooth_k: int):
+        self.params = params
+        self.smooth_k = smooth_k
+        self.count = 0
+        self.closes: deque = deque()  # SMA window
+        self.raws: deque = deque()  # %K smoothing window
+        self.lows: deque = deque()  # (bar, low) with increasing lows: front is the window minimum
+        self.highs: deque = deque()  # (bar, high) with decreasing highs: front is the window maximum
+        self.sma_state = np.zeros(7)
+        self.raw_state = np.zeros(7)
+        self.ema_fast = 0.0
+        self.ema_slow = 0.0
+        self.signal = 0.0
+
+    def push(self, high: float, low: float, close: float) -> Dict[str, float]:
+        i = self.count
+        self.count += 1
+        params = self.params
+
+        window = params.stoch_period
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((i, low))
+        if self.lows[0][0] <= i - window:
+            self.lows.popleft()
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((i, high))
+        if self.highs[0][0] <= i - window:
+            self.highs.popleft()
+        if i >= window - 1:
+            lowest_low, highest_high = self.lows[0][1], self.highs[0][1]
+        else:
+            lowest_low = highest_high = np.nan
+
+        if len(self.closes) == params.sma_period:
+            _mean_remove(self.sma_state, self.closes.popleft())
+        _mean_add(self.sma_state, close)
+        self.closes.append(close)
+        sma = _mean_value(self.sma_state, params.sma_period)
+
+        price_range = highest_high - lowest_low
+        raw = 100.0 * (close - lowest_low) / price_range if price_range != 0 else 0.0
+        if not math.isfinite(raw):
+            raw = 0.0
+        if len(self.raws) == self.smooth_k:
+            _mean_remove(self.raw_state, self.raws.popleft())
+        _mean_add(self.raw_state, raw)
+        self.raws.append(raw)
+        k = _mean_value(self.raw_state, self.smooth_k) - 50
+
+        if i == 0:
+            self.ema_fast = self.ema_slow = close
+        else:
+            self.ema_fast = _ema_step(self.ema_fast, close, 2.0 / (params.macd_fast + 1))
+            self.ema_slow = _ema_step(self.ema_slow, close, 2.0 / (params.macd_slow + 1))
+        macd = self.ema_fast - self.ema_slow
+        self.signal = macd if i == 0 else _ema_step(self.signal, macd, 2.0 / (params.macd_signal + 1))
+
+        return {"sma": sma, "k": k, "ema_fast": self.ema_fast, "ema_slow": self.ema_slow, "macd": macd, "signal": self.signal}
+
+    def peek(self, high: float, low: float, close: float) -> Dict[str, float]:
+        # Still-forming bar: the committed state is left untouched.
+        return copy.deepcopy(self).push(high, low, close)
+
+
+def _warmup(params: StrategyParams) -> int:
+    return max(params.sma_period, params.stoch_period, params.macd_slow, params.macd_signal) + 2
+
+
+def _filter_masks(
+    arrays: Dict[str, np.ndarray],
+    params: StrategyParams,
+    config: TraderConfig,
+    extremes: tuple[np.ndarray, np.ndarray] | None = None,
+) -> Dict[str, np.ndarray]:
+    lowest_low, highest_high = extremes if extremes is not None else _stoch_extremes(arrays, params.stoch_period)
+    base, macd_falling, signal_falling, k_rising = _filter_masks_nb(
+        arrays["low"],
+        arrays["close"],
+        arrays["in_date"],
+        lowest_low,
+        highest_high,
+        params.sma_period,
+        config.smooth_k,
+        params.macd_fast,
+        params.macd_slow,
+        params.macd_signal,
+    )
+    return {"base": base, "macd_falling": macd_falling, "signal_falling": signal_falling, "k_rising": k_rising}
+
+
+def _combo_masks(filters: Dict[str, np.ndarray], params: StrategyParams) -> tuple[np.ndarray, np.ndarray]:
+    entry_ok = filters["base"].copy()
+    if params.use_macd:
+        entry_ok &= filters["macd_falling"]
+    if params.use_signal:
+        entry_ok &= filters["signal_falling"]
+    mom_exit = filters["k_rising"] if params.use_momentum_exit else np.zeros_like(filters["k_rising"])
+    return entry_ok, mom_exit
+
+
+def _metrics_from_stats(
+    n_eq: int,
+    final_balance: float,
+    wins: int,
+    losses: int,
+    win_sum: float,
+    loss_sum: float,
+    sharpe_ratio: float,
+    config: TraderConfig,
+) -> BacktestMetrics:
+    starting_balance = config.starting_balance
+    if n_eq == 0:
+        return BacktestMetrics(0, 0, starting_balance, 0, 0, 0, None, 0, 0, 0, 0)
+
+    wins = int(wins)
+    losses = int(losses)
+    final_balance = float(final_balance)
+    pnl_value = final_balance - starting_balance
+    pnl_pct = (pnl_value / starting_balance) * 100
+    avg_win = win_sum / wins if wins else 0
+    avg_loss = loss_sum / losses if losses else 0
+    win_rate = wins / (wins + losses) * 100 if (wins + losses) > 0 else 0
+    rr_ratio = (avg_win / abs(avg_loss)) if avg_loss != 0 else None
+    sharpe = sharpe_ratio * np.sqrt(365 * 24 * 60 / config.agg_minutes) if sharpe_ratio != 0 else 0
+
+    return BacktestMetrics(pnl_pct, pnl_value, final_balance, avg_win, avg_loss, win_rate, rr_ratio, sharpe, 0, wins, losses)
+
+
+def _metrics(
+    equity_curve: np.ndarray,
+    wins: int,
+    losses: int,
+    win_sum: float,
+    loss_sum: float,
+    config: TraderConfig,
+) -> BacktestMetrics:
+    if len(equity_curve) == 0:
+        return _metrics_from_stats(0, config.starting_balance, wins, losses, win_sum, loss_sum, np.nan, config)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(equity_curve) / equity_curve[:-1]
+    returns = returns[~np.isnan(returns)]
+    if returns.size < 2:
+        sharpe_ratio = np.nan
+    else:
+        returns_std = returns.std(ddof=1)  # sample std, as pandas computed it
+        sharpe_ratio = returns.mean() / returns_std if returns_std != 0 else 0
+
+    return _metrics_from_stats(
+        len(equity_curve), equity_curve[-1], wins, losses, win_sum, loss_sum, sharpe_ratio, config
+    )
+
+
+def _evaluate(
+    arrays: Dict[str, np.ndarray],
+    params: StrategyParams,
+    config: TraderConfig,
+    capture_trades: bool = False,
+) -> tuple[BacktestMetrics, tuple]:
+    entry_ok, mom_exit = _combo_masks(_filter_masks(arrays, params, config), params)
+    warmup = _warmup(params)
+    equity = np.empty(max(len(arrays["close"]) - warmup + 1, 1))
+
+    (
+        n_eq,
+        wins,
+        losses,
+        win_sum,
+        loss_sum,
+        *trade_cols,
+    ) = _simulate_nb(
+        arrays["low"],
+        arrays["close"],
+        entry_ok,
+        mom_exit,
+        warmup,
+        float(config.starting_balance),
+        float(config.risk_fraction),
+        float(config.margin_rate),
+        float(config.min_notional),
+        arrays["fill_price"],
+        arrays["fill_ok"],
+        arrays["tp_target"],
+        equity,
+        capture_trades,
+    )
+    return _metrics(equity[:n_eq], wins, losses, win_sum, loss_sum, config), tuple(trade_cols)
+
+
+def _can_trade(params: StrategyParams, n_bars: int, config: TraderConfig) -> bool:
+    # The balance only moves through trades, so no later position can clear a minimum notional the first one misses.
+    first_notional = config.starting_balance * config.risk_fraction / config.margin_rate
+    return _warmup(params) < n_bars and first_notional >= config.min_notional
+
+
+def _flat_metrics(batch: List[StrategyParams], n_bars: int, config: TraderConfig) -> List[BacktestMetrics]:
+    # What the simulator returns for a flat equity curve.
+    equity = np.full(max(n_bars - _warmup(batch[0]), 0), float(config.starting_balance))
+    return [_metrics(equity, 0, 0, 0.0, 0.0, config)] * len(batch)
+
+
+def _result_columns(size: int) -> Dict[str, np.ndarray]:
+    dtypes = {"int": np.int64, "bool": np.bool_}
+    return {f.name: np.empty(size, dtype=dtypes.get(f.type, np.float64)) for f in fields(StrategyParams) + fields(BacktestMetrics)}
+
+
+def _store_results(
+    columns: Dict[str, np.ndarray], start: int, batch: List[StrategyParams], metrics: List[BacktestMetrics]
+) -> None:
+    stop = start + len(batch)
+    for f in fields(StrategyParams):
+        columns[f.name][start:stop] = [getattr(params, f.name) for params in batch]
+    for f in fields(BacktestMetrics):
+        columns[f.name][start:stop] = [getattr(m, f.name) for m in metrics]  # rr_ratio None -> NaN
+
+
+def _equity_buffer(rows: int, n_bars: int) -> np.ndarray:
+    # Wide enough for any warmup: the kernel writes at most n + 1 points.
+    return np.empty((rows, n_bars + 1))
+
+
+def _eval_batch(
+    arrays: Dict[str, np.ndarray],
+    batch: List[StrategyParams],
+    config: TraderConfig,
+    extremes: tuple[np.ndarray, np.ndarray],
+    equity: Optional[np.ndarray] = None,
+) -> List[BacktestMetrics]:
+    # Module-level so process pools can pickle it; the batch only differs in its filter flags.
+    if equity is None:
+        equity = _equity_buffer(len(batch), len(arrays["close"]))
+    filters = _filter_masks(arrays, batch[0], config, extremes)
+    masks = [_combo_masks(filters, params) for params in batch]
+    n_eq, wins, losses, win_sum, loss_sum = _simulate_batch_nb(
+        arrays["low"],
+        arrays["close"],
+        np.stack([entry_ok for entry_ok, _ in masks]),
+        np.stack([mom_exit for _, mom_exit in masks]),
+        _warmup(batch[0]),
+        float(config.starting_balance),
+        float(config.risk_fraction),
+        float(config.margin_rate),
+        float(config.min_notional),
+        arrays["fill_price"],
+        arrays["fill_ok"],
+        arrays["tp_target"],
+        equity,
+    )
+    return [_metrics(equity[c, : n_eq[c]], wins[c], losses[c], win_sum[c], loss_sum[c], config) for c in range(len(batch))]
+
+
+# Grid arrays mapped from shared memory, attached once per worker process by ``_attach_shared_arrays``.
+_WORKER_ARRAYS: Dict[str, np.ndarray] = {}
+_WORKER_BLOCKS: List[SharedMemory] = []
+
+
+def _share_arrays(arrays: Dict[str, np.ndarray], stack: ExitStack) -> Dict[str, tuple]:
+    specs = {}
+    for key, values in arrays.items():
+        block = SharedMemory(create=True, size=max(values.nbytes, 1))
+        stack.callback(block.unlink)
+        stack.callback(block.close)
+        np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+        specs[key] = (block.name, values.shape, values.dtype.str)
+    return specs
+
+
+def _attach_shared_arrays(specs: Dict[str, tuple]) -> None:
+    # Process-pool initializer.
+    for key, (name, shape, dtype) in specs.items():
+        block = SharedMemory(name=name)
+        _WORKER_BLOCKS.append(block)
+        _WORKER_ARRAYS[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _eval_batch_shared(batch: List[StrategyParams], config: TraderConfig) -> List[BacktestMetrics]:
+    period = batch[0].stoch_period
+    extremes = (_WORKER_ARRAYS[f"lowest_low_{period}"], _WORKER_ARRAYS[f"highest_high_{period}"])
+    return _eval_batch(_WORKER_ARRAYS, batch, config, extremes)
+
+
+def _grid_workers(n_jobs: int) -> int:
+    # -1 = all cores, -2 = all but one, ...
+    return n_jobs if n_jobs > 0 else max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+
+
+def _trades_frame(index: pd.Index, fill_price: np.ndarray, trade_cols: tuple, starting_balance: float) -> pd.DataFrame:
+    entry_idx, exit_idx, exit_price, pnl, qty, exit_code, n_trades = trade_cols
+    entry_idx = entry_idx[:n_trades]
+    pnl = pnl[:n_trades]
+    return pd.DataFrame(
+        {
+            "entry_time": index[entry_idx],
+            "exit_time": index[exit_idx[:n_trades]],
+            "side": "SHORT",
+            "entry_price": fill_price[entry_idx],
+            "exit_price": exit_price[:n_trades],
+            "pnl_value": pnl,
+            "pnl_pct": (pnl / starting_balance) * 100,
+            "qty": qty[:n_trades],
+            "exit_type": pd.Categorical.from_codes(exit_code[:n_trades], categories=EXIT_TYPES),
+        }
+    )
 
-        if not equity_curve:
-            return BacktestMetrics(0, 0, self.config.starting_balance, 0, 0, 0, None, 0, 0, 0, 0)
 
-        final_balance = equity_curve[-1]
-        pnl_value = final_balance - self.config.starting_balance
-        pnl_pct = (pnl_value / self.config.starting_balance) * 100
-        avg_win = float(np.mean(win_sizes)) if win_sizes else 0
-        avg_loss = float(np.mean(loss_sizes)) if loss_sizes else 0
-        win_rate = wins / (wins + losses) * 100 if (wins + losses) > 0 else 0
-        rr_ratio = (avg_win / abs(avg_loss)) if avg_loss != 0 else None
-        returns = pd.Series(equity_curve).pct_change().dropna()
-        sharpe = (returns.mean() / returns.std()) * np.sqrt(365 * 24 * 60 / self.config.agg_minutes) if returns.std() != 0 else 0
+class BacktestEngine:
+    def __init__(self, config: TraderConfig):
+        self.config = config
+        self._last_trades = pd.DataFrame()
+
+    def _run_backtest(self, data: pd.DataFrame, params: StrategyParams, capture_trades: bool = False) -> BacktestMetrics:
+        # ``data`` is already sorted by time and is not modified.
+        arrays = _market_arrays(data, self.config)
+        metrics, trade_cols = _evaluate(arrays, params, self.config, capture_trades)
 
-        self._last_trades = trades if capture_trades else []
-        return BacktestMetrics(pnl_pct, pnl_value, final_balance, avg_win, avg_loss, win_rate, rr_ratio, sharpe, 0, wins, losses)
+        self._last_trades = _trades_frame(data.index, arrays["fill_price"], trade_cols, self.config.starting_balance) if capture_trades else pd.DataFrame()
+        return metrics
 
     def run_backtest_with_trades(self, df_1m: pd.DataFrame, params: StrategyParams) -> tuple[pd.DataFrame, pd.DataFrame]:
+        df_1m = df_1m if df_1m.index.is_monotonic_increasing else df_1m.sort_index()
         metrics = self._run_backtest(df_1m, params, capture_trades=True)
-        trades_df = pd.DataFrame(self._last_trades) if hasattr(self, "_last_trades") else pd.DataFrame()
+        trades_df = self._last_trades
         metrics_df = pd.DataFrame([{**params.__dict__, **metrics.__dict__}])
         return metrics_df, trades_df
 
-    def grid_search_with_progress(self, df_1m: pd.DataFrame) -> pd.DataFrame:
-        results: List[Dict] = []
-        total = (
-            len(self.config.sma_period_range)
-            * len(self.config.stoch_period_range)
-            * len(self.config.use_macd_options)
-            * len(self.config.use_signal_options)
-            * len(self.config.use_momentum_exit_options)
-        )
-
-        for sma_p, stoch_p, use_macd, use_signal, use_mom in tqdm(
+    def _grid_batches(self) -> List[List[StrategyParams]]:
+        # One batch per (sma, stoch) pair: the filter flags only pick which precomputed masks are combined.
+        filter_options = list(
             product(
-                self.config.sma_period_range,
-                self.config.stoch_period_range,
                 self.config.use_macd_options,
                 self.config.use_signal_options,
                 self.config.use_momentum_exit_options,
-            ),
-            total=total,
-            desc="Param search",
-            ncols=80,
-        ):
-            params = StrategyParams(
-                sma_period=int(sma_p),
-                stoch_period=int(stoch_p),
-                macd_fast=self.config.macd_fast,
-                macd_slow=self.config.macd_slow,
-                macd_signal=self.config.macd_signal,
-                use_macd=bool(use_macd),
-                use_signal=bool(use_signal),
-                use_momentum_exit=bool(use_mom),
             )
-            metrics = self._run_backtest(df_1m, params, capture_trades=False)
-            results.append({**params.__dict__, **metrics.__dict__})
+        )
+        period_pairs = list(product(self.config.sma_period_range, self.config.stoch_period_range))
+        batches = [
+            [
+                StrategyParams(
+                    sma_period=int(sma_p),
+                    stoch_period=int(stoch_p),
+                    macd_fast=self.config.macd_fast,
+                    macd_slow=self.config.macd_slow,
+                    macd_signal=self.config.macd_signal,
+                    use_macd=bool(use_macd),
+                    use_signal=bool(use_signal),
+                    use_momentum_exit=bool(use_mom),
+                )
+                for use_macd, use_signal, use_mom in filter_options
+            ]
+            for sma_p, stoch_p in period_pairs
+        ]
+        return [batch for batch in batches if batch]
+
+    def grid_search_with_progress(self, df_1m: pd.DataFrame) -> pd.DataFrame:
+        batches = self._grid_batches()
+        total = sum(len(batch) for batch in batches)
+
+        # Sort once for the whole grid; each batch is independent and only needs the extracted arrays.
+        df_1m = df_1m if df_1m.index.is_monotonic_increasing else df_1m.sort_index()
+        arrays = _market_arrays(df_1m, self.config)
+
+        # The stochastic window extremes only depend on stoch_period: compute each once for all sma periods
+        # (the compiled grid kernel derives them per pair itself).
+        extremes = {} if NUMBA_AVAILABLE else {int(p): _stoch_extremes(arrays, int(p)) for p in self.config.stoch_period_range}
+
+        # Results go straight into preallocated columns, each batch at a fixed offset (grid order).
+        columns = _result_columns(total)
+        offsets = np.cumsum([0] + [len(batch) for batch in batches[:-1]])
+
+        # Batches that cannot open a trade are filled in flat without simulating them.
+        n_bars = len(arrays["close"])
+        pending = []
+        for i, batch in enumerate(batches):
+            if _can_trade(batch[0], n_bars, self.config):
+                pending.append(i)
+            else:
+                _store_results(columns, offsets[i], batch, _flat_metrics(batch, n_bars, self.config))
+
+        with tqdm(total=total, desc="Param search", ncols=80) as progress:
+            progress.update(total - sum(len(batches[i]) for i in pending))
+            if NUMBA_AVAILABLE and pending:
+                self._grid_search_compiled(arrays, batches, pending, columns, offsets, progress)
+            elif self.config.grid_n_jobs == 1 or len(pending) < 2:
+                equity = _equity_buffer(max((len(batch) for batch in batches), default=0), n_bars)
+                for i in pending:
+                    batch = batches[i]
+                    metrics = _eval_batch(arrays, batch, self.config, extremes[batch[0].stoch_period], equity)
+                    _store_results(columns, offsets[i], batch, metrics)
+                    progress.update(len(batch))
+            else:
+                # Publish the arrays in shared memory once; workers attach at startup and tasks carry only their batch.
+                shared = dict(arrays)
+                for period, (lowest_low, highest_high) in extremes.items():
+                    shared[f"lowest_low_{period}"] = lowest_low
+                    shared[f"highest_high_{period}"] = highest_high
+                with ExitStack() as stack:
+                    pool = stack.enter_context(
+                        ProcessPoolExecutor(
+                            max_workers=_grid_workers(self.config.grid_n_jobs),
+                            initializer=_attach_shared_arrays,
+                            initargs=(_share_arrays(shared, stack),),
+                        )
+                    )
+                    futures = {pool.submit(_eval_batch_shared, batches[i], self.config): i for i in pending}
+                    for future in as_completed(futures):
+                        metrics = future.result()
+                        _store_results(columns, offsets[futures[future]], batches[futures[future]], metrics)
+                        progress.update(len(metrics))
+
+        return pd.DataFrame(columns)
+
+    def _grid_search_compiled(
+        self,
+        arrays: Dict[str, np.ndarray],
+        batches: List[List[StrategyParams]],
+        pending: List[int],
+        columns: Dict[str, np.ndarray],
+        offsets: np.ndarray,
+        progress,
+    ) -> None:
+        # Chunks of one pair per core keep the threads busy while still advancing the progress bar.
+        flags = batches[pending[0]]
+        use_macd = np.array([params.use_macd for params in flags], dtype=np.bool_)
+        use_signal = np.array([params.use_signal for params in flags], dtype=np.bool_)
+        use_momentum_exit = np.array([params.use_momentum_exit for params in flags], dtype=np.bool_)
+        chunk_size = os.cpu_count() or 1
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start : start + chunk_size]
+            stats = _grid_kernel(
+                arrays["low"],
+                arrays["high"],
+                arrays["close"],
+                arrays["in_date"],
+                arrays["fill_price"],
+                arrays["fill_ok"],
+                arrays["tp_target"],
+                np.array([batches[i][0].sma_period for i in chunk], dtype=np.int64),
+                np.array([batches[i][0].stoch_period for i in chunk], dtype=np.int64),
+                use_macd,
+                use_signal,
+                use_momentum_exit,
+                int(self.config.smooth_k),
+                int(flags[0].macd_fast),
+                int(flags[0].macd_slow),
+                int(flags[0].macd_signal),
+                float(self.config.starting_balance),
+                float(self.config.risk_fraction),
+                float(self.config.margin_rate),
+                float(self.config.min_notional),
+            )
+            for row, i in enumerate(chunk):
+                metrics = [_metrics_from_stats(*combo, self.config) for combo in stats[row]]
+                _store_results(columns, offsets[i], batches[i], metrics)
+                progress.update(len(metrics))
+
+    def grid_search_halving(
+        self,
+        df_1m: pd.DataFrame,
+        rungs: Sequence[float] = (0.125, 0.25, 0.5, 1.0),
+        keep_frac: float = 0.5,
+    ) -> pd.DataFrame:
+        # Score every combination on a short prefix and keep the best ``keep_frac`` by pnl_pct for each longer one.
+        batches = self._grid_batches()
+        survivors = [params for batch in batches for params in batch]
+        sizes = [len(survivors)]
+        for _ in rungs[1:]:
+            sizes.append(max(1, math.ceil(sizes[-1] * keep_frac)))
+
+        df_1m = df_1m if df_1m.index.is_monotonic_increasing else df_1m.sort_index()
+        arrays = _market_arrays(df_1m, self.config)
+        n_bars = len(arrays["close"])
+        extremes = {int(p): _stoch_extremes(arrays, int(p)) for p in self.config.stoch_period_range}
+        equity = _equity_buffer(max((len(batch) for batch in batches), default=0), n_bars)
+
+        scored: List[tuple[StrategyParams, BacktestMetrics]] = []
+        with tqdm(total=sum(sizes), desc="Halving search", ncols=80) as progress:
+            for rung, size in zip(rungs, sizes):
+                if scored:
+                    scored.sort(key=lambda item: item[1].pnl_pct, reverse=True)
+                    survivors = [params for params, _ in scored[:size]]
+                # Every indicator is causal, so a prefix of the full-history arrays is exactly the shorter run's input.
+                end = max(1, int(n_bars * rung))
+                prefix = {name: values[:end] for name, values in arrays.items()}
+                groups: Dict[tuple[int, int], List[StrategyParams]] = {}
+                for params in survivors:
+                    groups.setdefault((params.sma_period, params.stoch_period), []).append(params)
+
+                scored = []
+                for batch in groups.values():
+                    if _can_trade(batch[0], end, self.config):
+                        lowest_low, highest_high = extremes[batch[0].stoch_period]
+                        metrics = _eval_batch(prefix, batch, self.config, (lowest_low[:end], highest_high[:end]), equity)
+                    else:
+                        metrics = _flat_metrics(batch, end, self.config)
+                    scored.extend(zip(batch, metrics))
+                    progress.update(len(batch))
 
-        return pd.DataFrame(results)
+        columns = _result_columns(len(scored))
+        _store_results(columns, 0, [params for params, _ in scored], [metrics for _, metrics in scored])
+        return pd.DataFrame(columns)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import math
 import os
 from dataclasses import dataclass, field
 from typing import Sequence
@@ -25,6 +26,7 @@ class TraderConfig:
     settlement_coin: str = "USDT"
     recv_window: int = 5000
     log_requests: bool = False
+    use_private_stream: bool = True  # serve equity/position from the private WebSocket instead of REST polling
     agg_minutes: int = DEFAULT_AGG_MINUTES
     margin_mode: str = "ISOLATED_MARGIN"
     position_idx: int = 1  # one-way mode short
@@ -32,8 +34,11 @@ class TraderConfig:
     slippage_bps: int = 0
     order_reject_prob: float = 0.0
     max_fill_latency: float = 0.0
+    fill_seed: int = 0  # RNG seed for the backtest's precomputed spread/slippage/reject fills
     risk_fraction: float = 0.95  # 95% equity
     margin_rate: float = 0.10  # ~10x notional when risking 95% equity
+    take_profit_pct: float = 0.004  # short TP distance below entry (0.4%)
+    min_notional: float = 0.0  # smallest position value the exchange accepts (0 = no minimum)
     log_blocked_trades: bool = True
     start_year: int = 2020
     start_month: int = 1
@@ -55,12 +60,27 @@ class TraderConfig:
     use_macd_options: Sequence[bool] = field(default_factory=lambda: (True, False))
     use_signal_options: Sequence[bool] = field(default_factory=lambda: (True, False))
     use_momentum_exit_options: Sequence[bool] = field(default_factory=lambda: (True, False))
+    grid_n_jobs: int = -1  # worker processes for the grid search (-1 = all cores, 1 = in-process)
+    use_successive_halving: bool = False  # rank the grid on growing data prefixes instead of a full sweep
 
     # Live loop options
     live_history_days: int = 1
     min_history_padding: int = 200
     time_in_force: str = "IOC"
     desired_leverage: float = 3.0
+    qty_step: float = 0.001  # symbol lot size step
+    price_tick: float = 0.000001  # order price precision
+    _qty_fmt: str = field(init=False, repr=False)
+    _price_fmt: str = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Order payload formats are fixed per symbol: build them once instead of per order.
+        self._qty_fmt = f"%.{max(0, -math.floor(math.log10(self.qty_step)))}f"
+        self._price_fmt = f"%.{max(0, -math.floor(math.log10(self.price_tick)))}f"
+
+    def quantize_qty(self, qty: float) -> float:
+        """Floor ``qty`` to a whole number of lot steps (the exchange rejects finer sizes)."""
+        return math.floor(qty / self.qty_step + 1e-9) * self.qty_step
 
     def as_log_string(self) -> str:
         return (
@@ -71,5 +91,5 @@ class TraderConfig:
             f"Risk per entry: {self.risk_fraction * 100:.1f}% equity | Margin rate: {self.margin_rate * 100:.1f}% | Start date: {self.start_year}-{self.start_month:02d}\n"
             f"TIF: {self.time_in_force} | Desired leverage: {self.desired_leverage}x | Settlement: {self.settlement_coin}\n"
             f"Margin mode: {self.margin_mode} | PositionIdx: {self.position_idx}\n"
-            "Strategy: Short-only, date-filtered, SMA + centered Stoch + optional MACD/Signal filters, fixed 0.4% TP, optional momentum exit."
+            f"Strategy: Short-only, date-filtered, SMA + centered Stoch + optional MACD/Signal filters, fixed {self.take_profit_pct * 100:.1f}% TP, optional momentum exit."
         )
@@ -1,18 +1,38 @@
 from __future__ import annotations
 
-from datetime import datetime
 import time
-from typing import Optional
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .config import TraderConfig
 
+# Prices stay float64 (the backtest and live indicators compute on them); Volume is only carried along.
+BAR_DTYPES = {"Open": np.float64, "High": np.float64, "Low": np.float64, "Close": np.float64, "Volume": np.float32}
+
+
+def _time_ordered(frame: pd.DataFrame) -> pd.DataFrame:
+    """``frame`` in ascending time order, sorting only when needed (kline pages arrive newest first)."""
+    if frame.index.is_monotonic_increasing:
+        return frame
+    if frame.index.is_monotonic_decreasing:
+        return frame.iloc[::-1]
+    return frame.sort_index()
+
 
 class DataClient:
     def __init__(self, config: TraderConfig):
         self.config = config
+        # One keep-alive session for every kline request, so the live loop reuses its TLS connection each tick.
+        # Kline GETs are idempotent: connection and read errors are retried with backoff.
+        self._session = requests.Session()
+        self._session.mount(
+            "https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=3, backoff_factor=0.2))
+        )
 
     def fetch_bybit_bars(
         self,
@@ -28,10 +48,38 @@ class DataClient:
         days = days or self.config.backtest_days
         interval_minutes = interval_minutes or self.config.agg_minutes
 
-        end = int(datetime.utcnow().timestamp())
+        end = int(time.time())  # epoch seconds; a naive utcnow() would be read as local time
         start = end - days * 24 * 60 * 60
-        df_list = []
+        df_list = self._fetch_klines(symbol, category, interval_minutes, start, end, max_retries, backoff_seconds)
 
+        if not df_list:
+            raise ValueError("No candle data received from Bybit.")
+
+        return _time_ordered(pd.concat(df_list))
+
+    def fetch_latest_bars(self, since: pd.Timestamp, interval_minutes: Optional[int] = None) -> pd.DataFrame:
+        """Bars opened after ``since`` (normally the last closed bar already held); the last one is still forming."""
+        interval_minutes = interval_minutes or self.config.agg_minutes
+        start = int(since.timestamp()) + interval_minutes * 60
+        # Always request at least one page: the forming bar is wanted even if the local clock lags the exchange.
+        end = max(int(time.time()), start + 1)
+        df_list = self._fetch_klines(self.config.symbol, self.config.category, interval_minutes, start, end, 5, 1.5)
+        if not df_list:
+            return pd.DataFrame(columns=list(BAR_DTYPES)).astype(BAR_DTYPES)
+        return _time_ordered(pd.concat(df_list))
+
+    def _fetch_klines(
+        self,
+        symbol: str,
+        category: str,
+        interval_minutes: int,
+        start: int,
+        end: int,
+        max_retries: int,
+        backoff_seconds: float,
+    ) -> List[pd.DataFrame]:
+        """Page through the kline endpoint from ``start`` to ``end`` (epoch seconds), one frame per page."""
+        df_list = []
         while start < end:
             url = "https://api.bybit.com/v5/market/kline"
             params = {
@@ -43,7 +91,7 @@ class DataClient:
             }
             attempt = 0
             while True:
-                resp = requests.get(url, params=params, timeout=10)
+                resp = self._session.get(url, params=params, timeout=10)
                 if not resp.ok:
                     raise RuntimeError(f"Bybit API request failed with status {resp.status_code}: {resp.text}")
 
@@ -63,20 +111,14 @@ class DataClient:
                 break
 
             df = pd.DataFrame(rows, columns=["timestamp", "Open", "High", "Low", "Close", "Volume", "turnover"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"].astype(int), unit="ms")
-            df = df.sort_values("timestamp")
-            for col in ["Open", "High", "Low", "Close", "Volume"]:
-                df[col] = df[col].astype(float)
-            df = df[["timestamp", "Open", "High", "Low", "Close", "Volume"]]
-            df.set_index("timestamp", inplace=True)
+            df.index = pd.to_datetime(df["timestamp"].astype(int), unit="ms").rename("timestamp")
+            # One cast of the bar columns instead of a column-by-column conversion (and frame copy) per field.
+            df = _time_ordered(df[list(BAR_DTYPES)].astype(BAR_DTYPES))
             df_list.append(df)
             start = int(df.index[-1].timestamp()) + interval_minutes * 60
-            time.sleep(0.2)
-
-        if not df_list:
-            raise ValueError("No candle data received from Bybit.")
-
-        return pd.concat(df_list).sort_index()
+            if start < end:
+                time.sleep(0.2)
+        return df_list
 
     def fetch_bybit_1m(self, symbol: Optional[str] = None, category: Optional[str] = None, days: Optional[int] = None) -> pd.DataFrame:
         """Backward compatible wrapper for code paths still requesting 1m bars."""
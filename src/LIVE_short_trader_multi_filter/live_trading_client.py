@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-from typing import Dict, Optional, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple
 
-from bybit_official_git_repo_scripts.unified_trading import HTTP
+from bybit_official_git_repo_scripts.unified_trading import HTTP, WebSocket
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .config import TraderConfig
 
 
 class BybitLiveClient:
-    """Lightweight wrapper around the official Bybit HTTP client for futures trading."""
+    """Lightweight wrapper around the official Bybit HTTP client for futures trading.
+
+    With ``config.use_private_stream`` set, equity and position are kept current by the private ``wallet`` and
+    ``position`` WebSocket topics and served from memory; REST is only used to seed them or while the stream is down.
+    """
 
     def __init__(self, config: TraderConfig):
         self.config = config
@@ -19,6 +26,106 @@ class BybitLiveClient:
             recv_window=config.recv_window,
             log_requests=config.log_requests,
         )
+        # pybit keeps one requests.Session (``http.client``); give it a small keep-alive pool and retry only
+        # connection setup here, since pybit already retries failed requests and orders must not be resent.
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1),
+        )
+        self.http.client.mount("https://", adapter)
+        # Constant order fields, copied and completed per order instead of rebuilding the whole payload.
+        self._short_payload_tmpl = {
+            "category": config.category,
+            "symbol": config.symbol,
+            "side": "Sell",
+            "orderType": "Limit",
+            "timeInForce": config.time_in_force,
+            "marginMode": config.margin_mode,
+            "positionIdx": config.position_idx,
+        }
+        self._close_payload_tmpl = {**self._short_payload_tmpl, "side": "Buy", "reduceOnly": True}
+
+        self._cache_lock = threading.Lock()
+        self._equity_cache: Optional[float] = None
+        self._position_cache: Optional[Dict] = None
+        self._position_known = False
+        self._ws: Optional[WebSocket] = None
+        self._seeded_socket: Optional[object] = None
+        if config.use_private_stream and config.api_key and config.api_secret:
+            self._start_private_stream()
+
+    def _start_private_stream(self) -> None:
+        try:
+            self._ws = WebSocket(
+                channel_type="private",
+                testnet=self.config.testnet,
+                api_key=self.config.api_key,
+                api_secret=self.config.api_secret,
+            )
+            self._ws.wallet_stream(self._on_wallet)
+            self._ws.position_stream(self._on_position)
+        except Exception as exc:  # noqa: BLE001
+            print(f"Private stream unavailable, polling REST instead: {exc}")
+            self._ws = None
+            return
+        self._stream_live()
+
+    def _stream_live(self) -> bool:
+        if self._ws is None or not self._ws.is_connected():
+            return False
+        # pybit reconnects on its own with a new socket, and updates pushed while it was down are lost:
+        # re-seed from REST whenever the socket changes; afterwards the caches only change on pushed updates.
+        socket = self._ws.ws
+        if socket is not self._seeded_socket:
+            with self._cache_lock:
+                self._equity_cache = None
+                self._position_known = False
+            self._seeded_socket = socket
+            self._fetch_equity_rest()
+            self._get_position_rest()
+        return True
+
+    def close(self) -> None:
+        if self._ws is not None:
+            self._ws.exit()
+            self._ws = None
+            self._seeded_socket = None
+
+    def _on_wallet(self, message: Dict) -> None:
+        equity = self._equity_from_accounts(message.get("data", []))
+        if equity is not None:
+            with self._cache_lock:
+                self._equity_cache = equity
+
+    def _on_position(self, message: Dict) -> None:
+        updates = [pos for pos in message.get("data", []) if pos.get("symbol") == self.config.symbol]
+        if not updates:
+            return
+        # A size-0 update for the symbol means the short was closed.
+        position = self._short_from_positions(updates)
+        with self._cache_lock:
+            self._position_cache = position
+            self._position_known = True
+
+    def _equity_from_accounts(self, accounts: List[Dict]) -> Optional[float]:
+        if not accounts:
+            return None
+        for coin_entry in accounts[0].get("coin", []):
+            if coin_entry.get("coin", "").upper() == self.config.settlement_coin.upper():
+                equity = coin_entry.get("equity") or coin_entry.get("walletBalance")
+                return float(equity) if equity is not None else None
+        return None
+
+    @staticmethod
+    def _short_from_positions(positions: List[Dict]) -> Optional[Dict]:
+        for pos in positions:
+            # Unified linear futures return size/avgPrice side in the payload
+            size = float(pos.get("size", 0) or 0)
+            side = pos.get("side")
+            if size > 0 and side and side.lower() == "sell":
+                return pos
+        return None
 
     def fetch_best_prices(self) -> Tuple[Optional[float], Optional[float], Optional[float]]:
         """Return (lastPrice, bestBid, bestAsk) for the configured symbol/category."""
@@ -45,39 +152,47 @@ class BybitLiveClient:
 
     def fetch_equity(self) -> Optional[float]:
         """Return available equity for the settlement coin."""
+        if self._stream_live():
+            with self._cache_lock:
+                equity = self._equity_cache
+            if equity is not None:
+                return equity
+        return self._fetch_equity_rest()
+
+    def _fetch_equity_rest(self) -> Optional[float]:
         try:
             resp = self.http.get_wallet_balance(
                 accountType=self.config.account_type,
                 coin=self.config.settlement_coin,
             )
-            coins = resp.get("result", {}).get("list", [])
-            if not coins:
-                return None
-            coin_info = coins[0].get("coin", [])
-            for coin_entry in coin_info:
-                if coin_entry.get("coin", "").upper() == self.config.settlement_coin.upper():
-                    equity = coin_entry.get("equity") or coin_entry.get("walletBalance")
-                    return float(equity) if equity is not None else None
-            return None
+            equity = self._equity_from_accounts(resp.get("result", {}).get("list", []))
         except Exception as exc:  # noqa: BLE001
             print(f"Failed to fetch wallet balance: {exc}")
             return None
+        if equity is not None:
+            with self._cache_lock:
+                self._equity_cache = equity
+        return equity
 
     def get_position(self) -> Optional[Dict]:
         """Fetch the current position for the configured symbol/category."""
+        if self._stream_live():
+            with self._cache_lock:
+                if self._position_known:
+                    return self._position_cache
+        return self._get_position_rest()
+
+    def _get_position_rest(self) -> Optional[Dict]:
         try:
             resp = self.http.get_positions(category=self.config.category, symbol=self.config.symbol)
-            positions = resp.get("result", {}).get("list", [])
-            for pos in positions:
-                # Unified linear futures return size/avgPrice side in the payload
-                size = float(pos.get("size", 0) or 0)
-                side = pos.get("side")
-                if size > 0 and side and side.lower() == "sell":
-                    return pos
-            return None
+            position = self._short_from_positions(resp.get("result", {}).get("list", []))
         except Exception as exc:  # noqa: BLE001
             print(f"Failed to fetch positions: {exc}")
             return None
+        with self._cache_lock:
+            self._position_cache = position
+            self._position_known = True
+        return position
 
     def place_short_limit(
         self,
@@ -91,34 +206,18 @@ class BybitLiveClient:
         if best_ask is not None and best_ask < limit_price:
             limit_price = best_ask
 
-        payload = {
-            "category": self.config.category,
-            "symbol": self.config.symbol,
-            "side": "Sell",
-            "orderType": "Limit",
-            "price": f"{limit_price:.6f}",
-            "qty": f"{qty}",
-            "timeInForce": self.config.time_in_force,
-            "marginMode": self.config.margin_mode,
-            "positionIdx": self.config.position_idx,
-        }
+        price_fmt = self.config._price_fmt
+        payload = self._short_payload_tmpl.copy()
+        payload["price"] = price_fmt % limit_price
+        payload["qty"] = self.config._qty_fmt % self.config.quantize_qty(qty)
         if tp_price is not None:
-            payload["takeProfit"] = f"{tp_price:.6f}"
+            payload["takeProfit"] = price_fmt % tp_price
             payload["tpTriggerBy"] = "LastPrice"
         return self.http.place_order(**payload)
 
     def close_short_limit_current(self, qty: float, current_price: float) -> Dict:
         """Submit a reduce-only limit buy at the current price to close the short."""
-        payload = {
-            "category": self.config.category,
-            "symbol": self.config.symbol,
-            "side": "Buy",
-            "orderType": "Limit",
-            "price": f"{float(current_price):.6f}",
-            "qty": f"{qty}",
-            "timeInForce": self.config.time_in_force,
-            "reduceOnly": True,
-            "marginMode": self.config.margin_mode,
-            "positionIdx": self.config.position_idx,
-        }
+        payload = self._close_payload_tmpl.copy()
+        payload["price"] = self.config._price_fmt % float(current_price)
+        payload["qty"] = self.config._qty_fmt % self.config.quantize_qty(qty)
         return self.http.place_order(**payload)
@@ -6,7 +6,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List
 
-from .paths import DATA_DIR
+from .paths import DATA_DIR, write_json_atomic
 
 
 @dataclass
@@ -26,7 +26,6 @@ class QueuedOptimization:
 class OptimizationQueue:
     def __init__(self, queue_path: Path | str | None = None):
         self.queue_path = Path(queue_path) if queue_path else DATA_DIR / "optimization_queue.json"
-        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
 
     def _load_existing(self) -> List[Dict[str, Any]]:
         if not self.queue_path.exists():
@@ -38,7 +37,7 @@ class OptimizationQueue:
         return data if isinstance(data, list) else []
 
     def _persist(self, entries: List[Dict[str, Any]]) -> None:
-        self.queue_path.write_text(json.dumps(entries, indent=2))
+        write_json_atomic(self.queue_path, entries)
 
     def enqueue(self, queued_at: datetime, ready_at: datetime, elapsed_seconds: float, payload: Dict[str, Any]) -> Dict[str, Any]:
         queue_item = QueuedOptimization(
@@ -2,7 +2,16 @@
 
 from __future__ import annotations
 
+import json
+import math
+import os
 from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib fallback below is slower.
+    orjson = None
 
 # Package location: /workspace/.../src/short_trader_multi_filter
 PACKAGE_ROOT = Path(__file__).resolve().parent
@@ -11,5 +20,30 @@ REPO_ROOT = PACKAGE_ROOT.parents[1]
 # Keep this variant's artifacts isolated.
 DATA_DIR = REPO_ROOT / "data" / "multi_filter"
 
-# Ensure the data directory always exists for JSON artifacts created at runtime.
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+def _finite_or_none(value: Any) -> Any:
+    # orjson writes NaN/inf as null; match it so the stdlib branch never emits the non-standard NaN token.
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite_or_none(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite_or_none(item) for item in value]
+    return value
+
+
+def write_json_atomic(path: Path, payload: Any) -> None:
+    """Write ``payload`` as indented JSON to a sibling temp file and ``os.replace`` it over ``path``.
+
+    Readers (and a crash mid-write) only ever see the previous file or the complete new one. Non-finite
+    floats are written as ``null`` by either encoder. The parent directory is created here, on first write,
+    rather than when the package is imported.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if orjson is not None:
+        data = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        data = json.dumps(_finite_or_none(payload), indent=2, allow_nan=False).encode()
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
@@ -1,4 +1,12 @@
 """Short-only margin call strategy utilities for Bybit linear futures (interactive symbol selection)."""
 
 from .config import TraderConfig
-from .main_engine import run  # noqa: F401
+
+
+def __getattr__(name: str):
+    # ``run`` pulls in pandas/numpy/numba via the engines; only import them when it is actually used.
+    if name == "run":
+        from .main_engine import run
+
+        return run
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,11 +6,10 @@ Usage:
     python -m short_trader_multi_filter
 """
 
-from .main_engine import run
-
 
 def main() -> None:
     """Execute the orchestrator."""
+    from .main_engine import run  # deferred: pulls in pandas/numpy/numba
 
     run()
 
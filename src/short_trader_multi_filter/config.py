@@ -19,8 +19,11 @@ class TraderConfig:
     slippage_bps: int = 0
     order_reject_prob: float = 0.0
     max_fill_latency: float = 0.0
+    fill_seed: int = 0  # RNG seed for the backtest's precomputed spread/slippage/reject fills
     risk_fraction: float = 0.95  # 95% equity
     margin_rate: float = 0.10  # ~10x notional when risking 95% equity
+    take_profit_pct: float = 0.004  # short TP distance below entry (0.4%)
+    min_notional: float = 0.0  # smallest position value the exchange accepts (0 = no minimum)
     log_blocked_trades: bool = True
     start_year: int = 2020
     start_month: int = 1
@@ -42,6 +45,8 @@ class TraderConfig:
     use_macd_options: Sequence[bool] = field(default_factory=lambda: (True, False))
     use_signal_options: Sequence[bool] = field(default_factory=lambda: (True, False))
     use_momentum_exit_options: Sequence[bool] = field(default_factory=lambda: (True, False))
+    grid_n_jobs: int = -1  # worker processes for the grid search (-1 = all cores, 1 = in-process)
+    use_successive_halving: bool = False  # rank the grid on growing data prefixes instead of a full sweep
 
     # Live loop options
     live_history_days: int = 1
@@ -54,5 +59,5 @@ class TraderConfig:
             f"Backtest window (days): {self.backtest_days} (~{self.backtest_days*24:.1f}h) | Aggregation: {self.agg_minutes}m\n"
             f"Fees: {self.bybit_fee * 100:.2f}% | Spread: {self.spread_bps} bps | Slippage: {self.slippage_bps} bps\n"
             f"Risk per entry: {self.risk_fraction * 100:.1f}% equity | Margin rate: {self.margin_rate * 100:.1f}% | Start date: {self.start_year}-{self.start_month:02d}\n"
-            "Strategy: Short-only, date-filtered, SMA + centered Stoch + optional MACD/Signal filters, fixed 0.4% TP, optional momentum exit."
+            f"Strategy: Short-only, date-filtered, SMA + centered Stoch + optional MACD/Signal filters, fixed {self.take_profit_pct * 100:.1f}% TP, optional momentum exit."
         )
@@ -1,141 +1,355 @@
 from __future__ import annotations
 
-import json
+import logging
+import queue
+import sys
 import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, List, NamedTuple, Optional
 
+import numpy as np
 import pandas as pd
 
-from .backtest_engine import BacktestEngine, StrategyParams, summarize_results
+try:
+    import numexpr
+except ImportError:  # numexpr is optional; the entry filter is then composed from NumPy comparisons.
+    numexpr = None
+
+from .backtest_engine import (
+    LIVE_INDICATOR_COLUMNS,
+    BacktestEngine,
+    LiveIndicatorState,
+    StrategyParams,
+    summarize_results,
+)
 from .config import TraderConfig
 from .data_client import DataClient
-from .paths import DATA_DIR
+from .order_utils import normalize_row, rolling_low_high
+from .paths import DATA_DIR, write_json_atomic
+
+
+logger = logging.getLogger(__name__)
+
+
+def _start_log_listener() -> QueueListener:
+    """Route ``logger`` through a queue so the live loop never blocks on stdout; the listener thread writes it."""
+    log_queue: queue.Queue = queue.Queue(-1)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(message)s"))
+    logger.handlers[:] = [QueueHandler(log_queue)]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener = QueueListener(log_queue, stream)
+    listener.start()
+    return listener
+
+
+class LastBar(NamedTuple):
+    """The live frame's last (still-forming) bar: the values one tick reads, pulled straight off the columns."""
+
+    ts: pd.Timestamp
+    high: float
+    low: float
+    close: float
+    sma: float
+    k: float
+    macd: float
+    signal: float
+    k_rising: bool
+    entry_signal: bool
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> LastBar:
+        return cls(data.index[-1], *(data[column].to_numpy()[-1] for column in _LAST_BAR_COLUMNS))
+
+
+_LAST_BAR_COLUMNS = ("High", "Low", "Close", "sma", "k", "macd", "signal", "k_rising", "entry_signal")
+
+
+class Trade(NamedTuple):
+    """One closed paper trade. The run's trades are kept as these records and only become a frame when reported."""
+
+    entry_time: pd.Timestamp
+    exit_time: pd.Timestamp
+    entry_price: float
+    exit_price: float
+    qty: float
+    pnl_value: float
+    equity: float
+    exit_type: str
+
+
+def _entry_filter(params: StrategyParams, config: TraderConfig) -> Callable[..., np.ndarray]:
+    """Build the per-bar entry filter (the backtest's entry_ok mask) for ``params``.
+
+    The filter is the low pattern, a falling SMA and the enabled MACD/Signal filters, from the configured start
+    month on; NaN comparisons and bars without two predecessors evaluate to False. The flags are fixed for an
+    engine's lifetime, so the enabled filters and the numexpr expression are resolved once, here.
+    """
+    falling = [name for name, enabled in (("macd", params.use_macd), ("signal", params.use_signal)) if enabled]
+    start_year = config.start_year
+    start_month = config.start_month
+    expr = "(low0 <= low1) & (low2 < low1) & (sma2 < sma1) & ((year > sy) | ((year == sy) & (month >= sm)))"
+    expr += "".join(f" & ({name}2 < {name}1)" for name in falling)
+
+    def entry_signal(
+        low: np.ndarray, sma: np.ndarray, macd: np.ndarray, signal: np.ndarray, index: pd.DatetimeIndex
+    ) -> np.ndarray:
+        entry = np.zeros(len(low), dtype=np.bool_)
+        if len(low) < 3:
+            return entry
+        year = index.year.to_numpy()[2:]
+        month = index.month.to_numpy()[2:]
+        columns = {"low": low, "sma": sma, "macd": macd, "signal": signal}
+        if numexpr is not None:
+            # One fused, multi-threaded pass over the bars instead of a temporary array per comparison.
+            operands = {"low0": low[:-2], "year": year, "month": month, "sy": start_year, "sm": start_month}
+            for name in ["low", "sma"] + falling:
+                operands[f"{name}1"] = columns[name][1:-1]
+                operands[f"{name}2"] = columns[name][2:]
+            numexpr.evaluate(expr, local_dict=operands, out=entry[2:])
+            return entry
+        ok = (low[:-2] <= low[1:-1]) & (low[2:] < low[1:-1]) & (sma[2:] < sma[1:-1])
+        for name in falling:
+            ok &= columns[name][2:] < columns[name][1:-1]
+        ok &= (year > start_year) | ((year == start_year) & (month >= start_month))
+        entry[2:] = ok
+        return entry
+
+    return entry_signal
 
 
 class LiveTradingEngine:
-    def __init__(self, config: TraderConfig, params: StrategyParams, results: Dict[str, float]):
+    def __init__(
+        self,
+        config: TraderConfig,
+        params: StrategyParams,
+        results: Dict[str, float],
+        data_client: Optional[DataClient] = None,
+    ):
         self.config = config
         self.params = params
         self.results = results
-        self.data_client = DataClient(config)
+        self._entry_signal = _entry_filter(params, config)
+        self._log_listener = _start_log_listener()
+        self.data_client = data_client or DataClient(config)
         self.position: Optional[Dict] = None
         self.equity = config.starting_balance
+        # After the cold start, closed bars (a bounded tail) and their running indicator state are cached.
+        self._indicators: Optional[LiveIndicatorState] = None
+        self._bars: Optional[pd.DataFrame] = None
+        # Running trade aggregates for the status line, updated on each exit.
+        self._pnl_sum = 0.0
+        self._win_count = 0
+        self._win_pnl_sum = 0.0
+        self._loss_count = 0
+        self._loss_pnl_sum = 0.0
+        self._trades: List[Trade] = []
+
+    def _prepare_dataframe(self) -> Optional[pd.DataFrame]:
+        """Indicator frame whose last row is the still-forming bar, or None when the exchange returned no bars.
 
-    def _prepare_dataframe(self) -> pd.DataFrame:
-        bars = self.data_client.fetch_bybit_bars(days=self.config.live_history_days, interval_minutes=self.config.agg_minutes)
-        data = bars.copy().sort_index()
+        Only the bars newer than the cached closed bars are fetched; each closed one advances the running
+        indicator state once, and the forming bar is evaluated without committing it.
+        """
+        if self._indicators is None:
+            return self._cold_start()
+        fresh = self.data_client.fetch_latest_bars(since=self._bars.index[-1], interval_minutes=self.config.agg_minutes)
+        if fresh.empty:
+            return None
+        high = fresh["High"].to_numpy(dtype=np.float64)
+        low = fresh["Low"].to_numpy(dtype=np.float64)
+        close = fresh["Close"].to_numpy(dtype=np.float64)
+        values = [self._indicators.push(h, l, c) for h, l, c in zip(high[:-1], low[:-1], close[:-1])]
+        values.append(self._indicators.peek(high[-1], low[-1], close[-1]))
+        for name in LIVE_INDICATOR_COLUMNS:
+            fresh[name] = [bar_values[name] for bar_values in values]
+        k = fresh["k"].to_numpy()
+        fresh["k_rising"] = k > np.concatenate(([self._bars["k"].iloc[-1]], k[:-1]))
+        # The entry filter looks two bars back: evaluate it with the last two cached closed bars as lead-in.
+        lead = self._bars.iloc[-2:]
+        columns = [np.concatenate((lead[name].to_numpy(), fresh[name].to_numpy())) for name in ("Low", "sma", "macd", "signal")]
+        entry_signal = self._entry_signal(*columns, lead.index.append(fresh.index))
+        fresh["entry_signal"] = entry_signal[len(lead) :]
+        self._bars = pd.concat([self._bars, fresh.iloc[:-1]]).iloc[-max(self.config.min_history_padding, 3) :]
+        return pd.concat([self._bars, fresh.iloc[-1:]])
+
+    def _cold_start(self) -> pd.DataFrame:
+        """Full history fetch and recompute, then replay the closed bars into the incremental indicator state."""
+        # fetch_bybit_bars hands back a fresh, sorted frame: the indicator columns can go straight onto it.
+        data = self.data_client.fetch_bybit_bars(days=self.config.live_history_days, interval_minutes=self.config.agg_minutes)
         data["sma"] = data["Close"].rolling(self.params.sma_period).mean()
 
-        lowest_low = data["Low"].rolling(self.params.stoch_period).min()
-        highest_high = data["High"].rolling(self.params.stoch_period).max()
-        raw_stoch = 100 * (data["Close"] - lowest_low) / (highest_high - lowest_low)
-        raw_stoch = raw_stoch.replace([pd.NA, pd.NaT, float("inf"), float("-inf")], 0).fillna(0)
-        data["k"] = raw_stoch.rolling(self.config.smooth_k).mean() - 50
+        # Stochastic window extremes straight off the High/Low arrays (NaN until the first full window), in O(n).
+        lowest_low, highest_high = rolling_low_high(
+            data["Low"].to_numpy(dtype=np.float64), data["High"].to_numpy(dtype=np.float64), self.params.stoch_period
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw_stoch = 100 * (data["Close"].to_numpy(dtype=np.float64) - lowest_low) / (highest_high - lowest_low)
+        raw_stoch[~np.isfinite(raw_stoch)] = 0
+        data["k"] = pd.Series(raw_stoch, index=data.index).rolling(self.config.smooth_k).mean() - 50
 
         data["ema_fast"] = data["Close"].ewm(span=self.params.macd_fast, adjust=False).mean()
         data["ema_slow"] = data["Close"].ewm(span=self.params.macd_slow, adjust=False).mean()
         data["macd"] = data["ema_fast"] - data["ema_slow"]
         data["signal"] = data["macd"].ewm(span=self.params.macd_signal, adjust=False).mean()
+        # Momentum-exit condition per bar (False while %K is NaN), as the backtest's k_rising mask.
+        data["k_rising"] = data["k"] > data["k"].shift()
+        data["entry_signal"] = self._entry_signal(
+            data["Low"].to_numpy(), data["sma"].to_numpy(), data["macd"].to_numpy(), data["signal"].to_numpy(), data.index
+        )
+
+        if len(data) >= 2:
+            state = LiveIndicatorState(self.params, self.config.smooth_k)
+            closed = data.iloc[:-1]
+            for h, l, c in zip(closed["High"].to_numpy(), closed["Low"].to_numpy(), closed["Close"].to_numpy()):
+                state.push(h, l, c)
+            self._indicators = state
+            self._bars = closed.iloc[-max(self.config.min_history_padding, 3) :]
         return data
 
-    def _should_enter(self, data: pd.DataFrame) -> bool:
-        if self.position is not None:
-            return False
-        row = data.iloc[-1]
-        year, month = row.name.year, row.name.month
-        in_date = (year > self.config.start_year) or (year == self.config.start_year and month >= self.config.start_month)
-        if not in_date:
-            return False
-        lows_ok = data["Low"].iloc[-3] <= data["Low"].iloc[-2] and data["Low"].iloc[-1] < data["Low"].iloc[-2]
-        sma_ok = row["sma"] < data["sma"].iloc[-2]
-        macd_ok = (not self.params.use_macd) or (row["macd"] < data["macd"].iloc[-2])
-        signal_ok = (not self.params.use_signal) or (row["signal"] < data["signal"].iloc[-2])
-        return lows_ok and sma_ok and macd_ok and signal_ok and not pd.isna(row["sma"])
-
-    def _enter(self, row: pd.Series):
+    def _should_enter(self, bar: LastBar) -> bool:
+        return self.position is None and bool(bar.entry_signal)
+
+    def _enter(self, bar: LastBar):
         risk_fraction = self.config.risk_fraction
         margin_rate = self.config.margin_rate
         position_value = (self.equity * risk_fraction) / margin_rate
-        qty = position_value / float(row["Close"])
+        qty = position_value / bar.close
         margin_used = self.equity * risk_fraction
         if margin_used <= 0 or qty <= 0:
             return
         self.equity -= margin_used
-        tp_price = float(row["Close"]) * (1 - 0.004)
+        tp_price = bar.close * (1 - self.config.take_profit_pct)
         # approximate liquidation similar to Bybit short: entry * (1 + margin_rate)
-        liq_price = float(row["Close"]) * (1 + margin_rate)
+        liq_price = bar.close * (1 + margin_rate)
         self.position = {
-            "entry_price": float(row["Close"]),
+            "entry_price": bar.close,
             "tp_price": tp_price,
             "qty": qty,
             "margin_used": margin_used,
-            "entry_time": row.name,
+            "entry_time": bar.ts,
             "liq_price": liq_price,
         }
-        print(f"ENTER SHORT @ {row['Close']:.6f} qty={qty:.4f} TP={tp_price:.6f} LIQ={liq_price:.6f} Equity={self.equity:.2f}")
+        logger.info(
+            "ENTER SHORT @ %.6f qty=%.4f TP=%.6f LIQ=%.6f Equity=%.2f", bar.close, qty, tp_price, liq_price, self.equity
+        )
 
-    def _maybe_exit(self, data: pd.DataFrame):
+    def _maybe_exit(self, bar: LastBar):
         if self.position is None:
             return
-        row = data.iloc[-1]
-        tp_hit = row["Low"] <= self.position["tp_price"]
-        mom_exit = self.params.use_momentum_exit and (row["k"] > data["k"].iloc[-2])
-        margin_call = row["High"] >= self.position.get("liq_price", float("inf"))
+        tp_hit = bar.low <= self.position["tp_price"]
+        mom_exit = self.params.use_momentum_exit and bar.k_rising
+        margin_call = bar.high >= self.position.get("liq_price", float("inf"))
         exit_price: Optional[float] = None
         exit_type = None
         if margin_call:
-            exit_price = float(self.position.get("liq_price", row["High"]))
+            exit_price = float(self.position.get("liq_price", bar.high))
             exit_type = "margin_call"
         elif tp_hit:
             exit_price = float(self.position["tp_price"])
             exit_type = "tp"
         elif mom_exit:
-            exit_price = float(row["Close"])
+            exit_price = float(bar.close)
             exit_type = "momentum"
         if exit_price is None:
             return
         gross = (self.position["entry_price"] - exit_price) * self.position["qty"]
         self.equity += self.position["margin_used"] + gross
-        print(
-            f"EXIT @ {exit_price:.6f} type={exit_type} pnl={gross:.4f} equity={self.equity:.2f}"
+        self._pnl_sum += gross
+        if gross > 0:
+            self._win_count += 1
+            self._win_pnl_sum += gross
+        else:
+            self._loss_count += 1
+            self._loss_pnl_sum += gross
+        self._trades.append(
+            Trade(
+                self.position["entry_time"],
+                bar.ts,
+                self.position["entry_price"],
+                exit_price,
+                self.position["qty"],
+                gross,
+                self.equity,
+                exit_type,
+            )
         )
+        logger.info("EXIT @ %.6f type=%s pnl=%.4f equity=%.2f", exit_price, exit_type, gross, self.equity)
         self.position = None
 
-    def _log_status(self, row: pd.Series):
-        nowstr = row.name.strftime("%Y-%m-%d %H:%M")
+    def trades_frame(self) -> pd.DataFrame:
+        """The closed trades of this run as a DataFrame, one row per ``Trade``."""
+        return pd.DataFrame.from_records(self._trades, columns=Trade._fields)
+
+    def _trade_summary(self) -> str:
+        trades = self._win_count + self._loss_count
+        if not trades:
+            return ""
+        win_rate = self._win_count / trades * 100
+        avg_win = self._win_pnl_sum / self._win_count if self._win_count else 0.0
+        avg_loss = self._loss_pnl_sum / self._loss_count if self._loss_count else 0.0
+        return f" | trades={trades} win%={win_rate:.1f} avg_win={avg_win:.4f} avg_loss={avg_loss:.4f} pnl={self._pnl_sum:.4f}"
+
+    def _log_status(self, bar: LastBar):
+        summary = self._trade_summary()
         if self.position:
-            print(
-                f"{nowstr} | STATUS | pos=SHORT qty={self.position['qty']:.4f} "
-                f"entry={self.position['entry_price']:.6f} tp={self.position['tp_price']:.6f} "
-                f"liq={self.position.get('liq_price', float('nan')):.6f} "
-                f"last={float(row['Close']):.6f} equity={self.equity:.2f}"
+            logger.info(
+                "%s | STATUS | pos=SHORT qty=%.4f entry=%.6f tp=%.6f liq=%.6f last=%.6f equity=%.2f%s",
+                bar.ts.strftime("%Y-%m-%d %H:%M"),
+                self.position["qty"],
+                self.position["entry_price"],
+                self.position["tp_price"],
+                self.position.get("liq_price", float("nan")),
+                bar.close,
+                self.equity,
+                summary,
             )
         else:
-            print(
-                f"{nowstr} | STATUS | flat | last={float(row['Close']):.6f} "
-                f"sma={float(row['sma']):.6f} k={float(row['k']):.3f} "
-                f"macd={float(row['macd']):.6f} signal={float(row['signal']):.6f} "
-                f"equity={self.equity:.2f}"
+            logger.info(
+                "%s | STATUS | flat | last=%.6f sma=%.6f k=%.3f macd=%.6f signal=%.6f equity=%.2f%s",
+                bar.ts.strftime("%Y-%m-%d %H:%M"),
+                bar.close,
+                bar.sma,
+                bar.k,
+                bar.macd,
+                bar.signal,
+                self.equity,
+                summary,
             )
 
     def run(self):
-        print("\n--- Live Short Trader (multi-filter) ---\n")
-        while True:
-            try:
-                data = self._prepare_dataframe()
-                self._maybe_exit(data)
-                if self._should_enter(data):
-                    self._enter(data.iloc[-1])
-                # Always provide a heartbeat so paper trading has useful updates.
-                self._log_status(data.iloc[-1])
-                time.sleep(60 * self.config.agg_minutes)
-            except KeyboardInterrupt:
-                print("Stopped by user.")
-                break
-            except Exception as exc:  # noqa: BLE001
-                print("Exception in live loop:", exc)
-                time.sleep(2)
+        logger.info("\n--- Live Short Trader (multi-filter) ---\n")
+        interval = 60 * self.config.agg_minutes
+        next_tick = time.monotonic()
+        try:
+            while True:
+                try:
+                    data = self._prepare_dataframe()
+                    if data is None:
+                        # The cached bars end at a closed bar; acting on it again would repeat the last signal.
+                        logger.warning("No new bars returned; skipping this tick.")
+                    else:
+                        bar = LastBar.from_frame(data)
+                        self._maybe_exit(bar)
+                        if self._should_enter(bar):
+                            self._enter(bar)
+                        # Always provide a heartbeat so paper trading has useful updates.
+                        self._log_status(bar)
+                    # Ticks run on a fixed monotonic schedule, so the time a tick takes does not push the next one back.
+                    next_tick = max(next_tick + interval, time.monotonic())
+                    time.sleep(max(0.0, next_tick - time.monotonic()))
+                except KeyboardInterrupt:
+                    logger.info("Stopped by user.")
+                    break
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("Exception in live loop: %s", exc)
+                    time.sleep(2)
+        finally:
+            if self._trades:
+                logger.info("\n==== PAPER TRADES ====\n%s", self.trades_frame().to_string(index=False))
+            self._log_listener.stop()
 
 
 class MainEngine:
@@ -144,7 +358,6 @@ class MainEngine:
         self.data_client = DataClient(self.config)
         self.backtest_engine = BacktestEngine(self.config)
         self.best_params_path = Path(best_params_path) if best_params_path else DATA_DIR / "best_params.json"
-        self.best_params_path.parent.mkdir(parents=True, exist_ok=True)
 
     def log_config(self):
         print("\n===== STRATEGY CONFIGURATION =====")
@@ -157,17 +370,20 @@ class MainEngine:
             "symbol": self.config.symbol,
             "category": self.config.category,
             "agg_minutes": self.config.agg_minutes,
-            "params": {k: (v.item() if hasattr(v, "item") else v) for k, v in best.to_dict().items()},
+            "params": normalize_row(best),
             "results": results,
         }
-        self.best_params_path.write_text(json.dumps(payload, indent=2))
+        write_json_atomic(self.best_params_path, payload)
         print(f"Saved optimal parameters to {self.best_params_path.resolve()}")
 
     def run_backtests(self) -> tuple[pd.DataFrame, pd.DataFrame, Dict[str, float]]:
         print(f"Fetching data and running optimizer on {self.config.agg_minutes}m bars...")
         df = self.data_client.fetch_bybit_bars(days=self.config.backtest_days, interval_minutes=self.config.agg_minutes)
 
-        dfres = self.backtest_engine.grid_search_with_progress(df)
+        if self.config.use_successive_halving:
+            dfres = self.backtest_engine.grid_search_halving(df)
+        else:
+            dfres = self.backtest_engine.grid_search_with_progress(df)
         best = dfres.sort_values("pnl_pct", ascending=False).head(1)
         results = summarize_results(best, self.config.starting_balance)
 
@@ -216,7 +432,7 @@ class MainEngine:
             bool(best.iloc[0]["use_signal"]),
             bool(best.iloc[0]["use_momentum_exit"]),
         )
-        LiveTradingEngine(self.config, params, results).run()
+        LiveTradingEngine(self.config, params, results, data_client=self.data_client).run()
 
 
 def run():
@@ -3,13 +3,26 @@ from __future__ import annotations
 import random
 import time
 from dataclasses import dataclass
-from typing import Optional, Sequence, Tuple
+from typing import Dict, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
 from .config import TraderConfig
 
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional; decorated kernels run as plain Python without it.
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 
 def bybit_fee_fn(trade_value: float, config: TraderConfig) -> float:
     return trade_value * config.bybit_fee
@@ -43,6 +56,70 @@ def simulate_order_fill(
     return fill_price, "filled"
 
 
+def precompute_fills(
+    mid_price: np.ndarray, config: TraderConfig, seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized, seeded ``simulate_order_fill`` for short entries: ``(fill_price, fill_ok)`` per bar."""
+    mid_price = np.asarray(mid_price, dtype=np.float64)
+    n = len(mid_price)
+    if config.spread_bps == 0 and config.slippage_bps == 0 and config.order_reject_prob == 0:
+        return mid_price, np.ones(n, dtype=np.bool_)
+
+    rng = np.random.default_rng(config.fill_seed if seed is None else seed)
+    fill_ok = rng.random(n) >= config.order_reject_prob
+    slippage = np.abs(rng.normal(config.slippage_bps, config.slippage_bps / 2, n))
+    fill_price = mid_price - mid_price * (config.spread_bps / 10000) - mid_price * (slippage / 10000)
+    return fill_price, fill_ok
+
+
+@njit(cache=True)
+def rolling_low_high(low: np.ndarray, high: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """O(n) ``rolling(window).min()`` of ``low`` and ``.max()`` of ``high``, NaN handling included."""
+    n = len(low)
+    lowest = np.full(n, np.nan)
+    highest = np.full(n, np.nan)
+    # Every index is pushed at most once, so plain arrays with head/tail cursors serve as the deques.
+    min_dq = np.empty(n, dtype=np.int64)
+    max_dq = np.empty(n, dtype=np.int64)
+    min_head = min_tail = max_head = max_tail = 0
+    low_nans = high_nans = 0
+    for i in range(n):
+        lo = low[i]
+        hi = high[i]
+        if np.isnan(lo):
+            low_nans += 1
+        else:
+            while min_tail > min_head and low[min_dq[min_tail - 1]] >= lo:
+                min_tail -= 1
+            min_dq[min_tail] = i
+            min_tail += 1
+        if np.isnan(hi):
+            high_nans += 1
+        else:
+            while max_tail > max_head and high[max_dq[max_tail - 1]] <= hi:
+                max_tail -= 1
+            max_dq[max_tail] = i
+            max_tail += 1
+
+        start = i - window + 1
+        if start > 0:
+            # Bar start - 1 just left the window.
+            if np.isnan(low[start - 1]):
+                low_nans -= 1
+            if np.isnan(high[start - 1]):
+                high_nans -= 1
+        if min_tail > min_head and min_dq[min_head] < start:
+            min_head += 1
+        if max_tail > max_head and max_dq[max_head] < start:
+            max_head += 1
+        if start >= 0:
+            if low_nans == 0:
+                lowest[i] = low[min_dq[min_head]]
+            if high_nans == 0:
+                highest[i] = high[max_dq[max_head]]
+    return lowest, highest
+
+
 def mark_to_market_equity(
     cash_equity: float,
     position: int,
@@ -96,6 +173,11 @@ def resolve_leverage(margin_used: float, desired_leverage: float, config: Trader
         leverage = float(allowed)
 
 
+def normalize_row(row: pd.Series) -> Dict[str, object]:
+    """``row`` as a plain dict with NumPy scalars unwrapped to Python values (JSON-serializable)."""
+    return {key: (value.item() if isinstance(value, np.generic) else value) for key, value in row.to_dict().items()}
+
+
 @dataclass
 class PositionState:
     side: Optional[str] = None  # "long" or "short"
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The packages live under src/ and are run with PYTHONPATH=src; make the tests work the same way.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,165 @@
+import importlib
+import sys
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PACKAGE = "short_trader_multi_filter"
+METRIC_COLUMNS = ("pnl_pct", "pnl_value", "final_balance", "avg_win", "avg_loss", "win_rate", "sharpe", "drawdown", "wins", "losses")
+GRID_KEYS = ["sma_period", "stoch_period", "use_macd", "use_signal", "use_momentum_exit"]
+
+
+def _random_bars(n: int, seed: int, tick: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    if tick:
+        # Prices on a tick grid with flat stretches, so consecutive SMAs tie and the compensated mean has to match.
+        close = 30000 + np.cumsum(rng.choice([-1, 0, 0, 1], n)) * tick
+        open_ = close + rng.choice([-tick, 0.0, tick], n)
+        wick = np.round(np.abs(rng.normal(0, 2 * tick, n)) / tick) * tick
+    else:
+        close = 100 + np.cumsum(rng.normal(0, 0.3, n))
+        open_ = close + rng.normal(0, 0.1, n)
+        wick = np.abs(rng.normal(0, 0.2, n))
+    high = np.maximum(open_, close) + wick
+    low = np.minimum(open_, close) - wick[::-1]
+    index = pd.date_range("2024-01-01", periods=n, freq="3min")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": 1.0}, index=index)
+
+
+def _reference_metrics(data: pd.DataFrame, config, sma_p, stoch_p, use_macd, use_signal, use_mom) -> dict:
+    # The original pandas backtest: rolling/ewm indicators and a bar-by-bar loop.
+    sma = data["Close"].rolling(sma_p).mean()
+    lowest_low = data["Low"].rolling(stoch_p).min()
+    highest_high = data["High"].rolling(stoch_p).max()
+    raw_stoch = 100 * (data["Close"] - lowest_low) / (highest_high - lowest_low)
+    raw_stoch = raw_stoch.replace([np.inf, -np.inf], np.nan).fillna(0)
+    k = (raw_stoch.rolling(config.smooth_k).mean() - 50).to_numpy()
+    macd_series = data["Close"].ewm(span=config.macd_fast, adjust=False).mean() - data["Close"].ewm(span=config.macd_slow, adjust=False).mean()
+    signal = macd_series.ewm(span=config.macd_signal, adjust=False).mean().to_numpy()
+    sma, macd = sma.to_numpy(), macd_series.to_numpy()
+    low, close = data["Low"].to_numpy(), data["Close"].to_numpy()
+
+    balance = config.starting_balance
+    equity_curve, win_sizes, loss_sizes = [], [], []
+    position = None
+
+    def close_position(exit_price):
+        nonlocal balance
+        entry_price, tp_price, qty, margin_used = position
+        gross = (entry_price - exit_price) * qty
+        balance += margin_used + gross
+        (win_sizes if gross > 0 else loss_sizes).append(gross / config.starting_balance * 100)
+
+    warmup = max(sma_p, stoch_p, config.macd_slow, config.macd_signal) + 2
+    for i in range(warmup, len(data)):
+        if position is None:
+            entry = (
+                low[i - 2] <= low[i - 1]
+                and low[i] < low[i - 1]
+                and sma[i] < sma[i - 1]
+                and (not use_macd or macd[i] < macd[i - 1])
+                and (not use_signal or signal[i] < signal[i - 1])
+                and not np.isnan(sma[i])
+            )
+            if entry:
+                margin_used = balance * config.risk_fraction
+                balance -= margin_used
+                qty = margin_used / config.margin_rate / close[i]
+                position = (close[i], close[i] * (1 - config.take_profit_pct), qty, margin_used)
+                equity_curve.append(balance + margin_used)
+                continue
+        else:
+            if low[i] <= position[1]:
+                close_position(position[1])
+                position = None
+            elif use_mom and k[i] > k[i - 1]:
+                close_position(close[i])
+                position = None
+        equity_curve.append(balance + (position[3] if position else 0))
+    if position is not None:
+        close_position(close[-1])
+        equity_curve.append(balance)
+
+    if not equity_curve:
+        return dict(zip(METRIC_COLUMNS, (0, 0, config.starting_balance, 0, 0, 0, 0, 0, 0, 0)))
+    final_balance = equity_curve[-1]
+    pnl_value = final_balance - config.starting_balance
+    wins, losses = len(win_sizes), len(loss_sizes)
+    returns = pd.Series(equity_curve).pct_change().dropna()
+    std = returns.std()
+    sharpe = returns.mean() / std * np.sqrt(365 * 24 * 60 / config.agg_minutes) if std != 0 else 0
+    return {
+        "pnl_pct": pnl_value / config.starting_balance * 100,
+        "pnl_value": pnl_value,
+        "final_balance": final_balance,
+        "avg_win": float(np.mean(win_sizes)) if win_sizes else 0,
+        "avg_loss": float(np.mean(loss_sizes)) if loss_sizes else 0,
+        "win_rate": wins / (wins + losses) * 100 if wins + losses else 0,
+        "sharpe": sharpe,
+        "drawdown": 0,
+        "wins": wins,
+        "losses": losses,
+    }
+
+
+def _reference_grid(data: pd.DataFrame, config) -> pd.DataFrame:
+    rows = []
+    for combo in product(
+        config.sma_period_range,
+        config.stoch_period_range,
+        config.use_macd_options,
+        config.use_signal_options,
+        config.use_momentum_exit_options,
+    ):
+        rows.append({**dict(zip(GRID_KEYS, combo)), **_reference_metrics(data, config, *combo)})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(params=["numba", "fallback"])
+def engine_modules(request, monkeypatch):
+    backtest = importlib.import_module(f"{PACKAGE}.backtest_engine")
+    config = importlib.import_module(f"{PACKAGE}.config")
+    if request.param == "numba":
+        if not backtest.NUMBA_AVAILABLE:
+            pytest.skip("numba is not installed")
+        return backtest, config
+    # Re-import the package with numba blocked; monkeypatch puts the original modules back afterwards.
+    for name in [name for name in sys.modules if name.split(".")[0] == PACKAGE]:
+        monkeypatch.delitem(sys.modules, name)
+    monkeypatch.setitem(sys.modules, "numba", None)
+    backtest = importlib.import_module(f"{PACKAGE}.backtest_engine")
+    assert not backtest.NUMBA_AVAILABLE
+    return backtest, importlib.import_module(f"{PACKAGE}.config")
+
+
+@pytest.mark.parametrize("grid_n_jobs", [1, 2])
+@pytest.mark.parametrize(
+    "n_bars, seed, tick",
+    [
+        (20, 1, 0.0),  # shorter than every sma_period: nothing can trade
+        (55, 2, 0.0),  # the sma=50 warmup leaves three bars
+        (400, 3, 0.0),
+        (1500, 4, 0.5),  # tied SMAs
+    ],
+)
+def test_grid_search_matches_pandas_reference(engine_modules, grid_n_jobs, n_bars, seed, tick):
+    backtest, config_module = engine_modules
+    config = config_module.TraderConfig(sma_period_range=(5, 20, 50), stoch_period_range=(5, 14), grid_n_jobs=grid_n_jobs)
+    data = _random_bars(n_bars, seed, tick)
+
+    result = backtest.BacktestEngine(config).grid_search_with_progress(data)
+    expected = _reference_grid(data, config)
+
+    result = result.sort_values(GRID_KEYS).reset_index(drop=True)
+    expected = expected.sort_values(GRID_KEYS).reset_index(drop=True)
+    for column in GRID_KEYS:
+        assert result[column].tolist() == expected[column].tolist()
+    for column in METRIC_COLUMNS:
+        np.testing.assert_allclose(
+            result[column].astype(float), expected[column].astype(float), rtol=1e-9, atol=1e-9, err_msg=column
+        )
+    rr_expected = [avg_win / abs(avg_loss) if avg_loss != 0 else None for avg_win, avg_loss in zip(expected["avg_win"], expected["avg_loss"])]
+    for got, want in zip(result["rr_ratio"], rr_expected):
+        assert (got is None or pd.isna(got)) if want is None else got == pytest.approx(want, rel=1e-9)